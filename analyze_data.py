@@ -8,10 +8,21 @@ Run this BEFORE running the FastAPI server:
 
 import csv
 import os
+from collections import Counter
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Base, AnalysisRun, CityData, CityExceedsThreshold, get_database_url
+from itertools import islice
+from sqlalchemy import insert, select
+from models import Base, AnalysisRun, CityData, CityExceedsThreshold, Region, create_db_engine, get_database_url
+
+# Columns every input CSV must provide
+CSV_COLUMNS = ('City', 'Region', 'Number_of_Galamsay_Sites')
+
+# Placeholder values (casefolded) that mark a row as invalid
+INVALID_CITIES = frozenset({'unknown city'})
+INVALID_REGIONS = frozenset({'invalid region'})
+
+# Rows sent per executemany when saving city data
+INSERT_BATCH_SIZE = 5000
 
 
 class GalamsayAnalyzer:
@@ -23,6 +34,32 @@ class GalamsayAnalyzer:
         self.cleaned_data = []
         self.errors = []
     
+    @classmethod
+    def from_raw_rows(cls, rows, source: str = '<rows>') -> 'GalamsayAnalyzer':
+        """
+        Build an analyzer from rows already parsed into CSV-style dicts
+        (keys City, Region, Number_of_Galamsay_Sites), skipping load_csv().
+        Call clean_data() and analyze() on the result as usual.
+        """
+        analyzer = cls(source)
+        analyzer.raw_data = list(rows)
+        return analyzer
+    
+    def _iter_raw(self):
+        """
+        Yield raw CSV rows one at a time without keeping them in memory.
+        Raises ValueError if the header is missing required columns.
+        """
+        with open(self.csv_file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            
+            # Check the header once instead of failing on every row
+            missing = [col for col in CSV_COLUMNS if col not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Missing columns in CSV: {', '.join(missing)}")
+            
+            yield from reader
+    
     def load_csv(self) -> bool:
         """
         Load CSV file and return raw data.
@@ -33,9 +70,7 @@ class GalamsayAnalyzer:
                 self.errors.append(f"File not found: {self.csv_file_path}")
                 return False
             
-            with open(self.csv_file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                self.raw_data = list(reader)
+            self.raw_data = list(self._iter_raw())
             
             print(f"✓ Loaded {len(self.raw_data)} records from CSV")
             return True
@@ -43,6 +78,38 @@ class GalamsayAnalyzer:
             self.errors.append(f"Error loading CSV: {str(e)}")
             return False
     
+    def load_and_clean(self) -> bool:
+        """
+        Stream the CSV straight into cleaned_data, one row at a time.
+        Unlike load_csv() + clean_data(), raw rows are never kept in memory,
+        so peak memory only depends on the number of valid records.
+        """
+        try:
+            if not os.path.exists(self.csv_file_path):
+                self.errors.append(f"File not found: {self.csv_file_path}")
+                return False
+            
+            clean_row = self.clean_row
+            cleaned_data = []
+            total = 0
+            for row in self._iter_raw():
+                total += 1
+                cleaned = clean_row(row)
+                if cleaned is not None:
+                    cleaned_data.append(cleaned)
+        except Exception as e:
+            self.errors.append(f"Error loading CSV: {str(e)}")
+            return False
+        
+        print(f"✓ Loaded {total} records from CSV")
+        if not total:
+            self.errors.append("No data to clean. CSV has no records.")
+            return False
+        
+        self.cleaned_data = cleaned_data
+        print(f"✓ Cleaned data: {len(self.cleaned_data)} valid records (removed {total - len(self.cleaned_data)} invalid records)")
+        return True
+    
     def clean_row(self, row: dict) -> dict:
         """
         Clean a single row of data.
@@ -54,20 +121,24 @@ class GalamsayAnalyzer:
         - Remove rows with invalid data
         """
         try:
-            city = row.get('City', '').strip()
-            region = row.get('Region', '').strip()
-            sites_str = row.get('Number_of_Galamsay_Sites', '').strip()
-            
+            # Fields are only normalised once the previous check has passed,
+            # so rejected rows don't pay for work on the remaining columns
+            city = (row.get('City') or '').strip()
+
             # Validation: Check if city is empty or unknown
-            if not city or city.lower() == 'unknown city':
+            if not city or city.casefold() in INVALID_CITIES:
                 self.errors.append(f"Invalid city: {city}")
                 return None
-            
+
+            region = (row.get('Region') or '').strip()
+
             # Validation: Check if region is empty or invalid
-            if not region or region.lower() == 'invalid region':
+            if not region or region.casefold() in INVALID_REGIONS:
                 self.errors.append(f"Invalid region for city {city}: {region}")
                 return None
-            
+
+            sites_str = (row.get('Number_of_Galamsay_Sites') or '').strip()
+
             # Validation: Try to convert sites to integer
             try:
                 sites = int(sites_str)
@@ -102,12 +173,13 @@ class GalamsayAnalyzer:
             self.errors.append("No data to clean. Load CSV first.")
             return False
         
-        self.cleaned_data = []
-        for row in self.raw_data:
-            cleaned = self.clean_row(row)
-            if cleaned:
-                self.cleaned_data.append(cleaned)
-        
+        # Single comprehension with a bound method avoids per-row attribute lookups
+        clean_row = self.clean_row
+        self.cleaned_data = [
+            cleaned for cleaned in map(clean_row, self.raw_data)
+            if cleaned is not None
+        ]
+
         print(f"✓ Cleaned data: {len(self.cleaned_data)} valid records (removed {len(self.raw_data) - len(self.cleaned_data)} invalid records)")
         return True
     
@@ -120,37 +192,66 @@ class GalamsayAnalyzer:
             self.errors.append("No cleaned data to analyze")
             return {}
         
-        # Calculate total galamsay sites
-        total_sites = sum(row['sites'] for row in self.cleaned_data)
-        
-        # Group by region and count sites
-        region_totals = {}
+        threshold = 10
+        total_sites = 0
+        region_totals = Counter()
+        cities_exceeding = []
+
+        # Single pass: total sites, per-region totals and threshold filter
         for row in self.cleaned_data:
-            region = row['region']
-            region_totals[region] = region_totals.get(region, 0) + row['sites']
-        
-        # Find region with highest sites
-        region_with_highest = max(region_totals, key=region_totals.get)
-        highest_count = region_totals[region_with_highest]
-        
+            sites = row['sites']
+            total_sites += sites
+            region_totals[row['region']] += sites
+            if sites > threshold:
+                cities_exceeding.append(row)
+
+        # Sort once here so the display and the stored ranks share one order
+        cities_exceeding.sort(key=lambda row: row['sites'], reverse=True)
+
+        # Find region with highest sites (over regions, not rows)
+        region_with_highest, highest_count = region_totals.most_common(1)[0]
+
         # Calculate average sites per region
         avg_per_region = total_sites / len(region_totals) if region_totals else 0
-        
-        # Find cities exceeding threshold
-        threshold = 10
-        cities_exceeding = [row for row in self.cleaned_data if row['sites'] > threshold]
-        
+
         return {
             'total_sites': total_sites,
             'region_with_highest': region_with_highest,
             'highest_count': highest_count,
             'avg_per_region': avg_per_region,
             'cities_exceeding_threshold': cities_exceeding,
-            'region_totals': region_totals,
+            'region_totals': dict(region_totals),
             'cleaned_data': self.cleaned_data
         }
 
 
+def batched(rows, size: int):
+    """Yield lists of at most `size` items from any iterable."""
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def get_region_ids(conn, region_names) -> dict:
+    """
+    Map region names to Region ids, inserting any regions not seen before.
+    Returns a {name: id} dict used to fill region_id on city rows.
+    """
+    region_names = set(region_names)
+    region_ids = dict(
+        conn.execute(select(Region.name, Region.id).where(Region.name.in_(region_names))).all()
+    )
+    
+    missing = region_names - region_ids.keys()
+    if missing:
+        conn.execute(insert(Region), [{'name': name} for name in missing])
+        region_ids.update(
+            conn.execute(select(Region.name, Region.id).where(Region.name.in_(missing))).all()
+        )
+    
+    return region_ids
+
+
 def save_analysis_to_database(analysis_results: dict):
     """
     Save analysis results to database.
@@ -158,49 +259,62 @@ def save_analysis_to_database(analysis_results: dict):
     """
     try:
         # Setup database
-        engine = create_engine(get_database_url())
+        engine = create_db_engine(get_database_url(), insertmanyvalues_page_size=INSERT_BATCH_SIZE)
         Base.metadata.create_all(bind=engine)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        
-        # Create analysis run record
-        analysis_run = AnalysisRun(
-            timestamp=datetime.utcnow(),
-            total_galamsay_sites=analysis_results['total_sites'],
-            region_with_highest_sites=analysis_results['region_with_highest'],
-            highest_sites_count=analysis_results['highest_count'],
-            average_sites_per_region=round(analysis_results['avg_per_region'], 2),
-            status='success'
-        )
-        session.add(analysis_run)
-        session.flush()  # Get the ID without committing
+        timestamp = datetime.utcnow()
         
-        # Store cleaned city data
-        for row in analysis_results['cleaned_data']:
-            city_data = CityData(
-                analysis_run_id=analysis_run.id,
-                city=row['city'],
-                region=row['region'],
-                galamsay_sites=row['sites']
+        # Everything is written with Core inserts in a single transaction
+        # (one BEGIN/COMMIT, no ORM unit of work)
+        with engine.begin() as conn:
+            # Create analysis run record
+            result = conn.execute(
+                insert(AnalysisRun).values(
+                    timestamp=timestamp,
+                    total_galamsay_sites=analysis_results['total_sites'],
+                    region_with_highest_sites=analysis_results['region_with_highest'],
+                    highest_sites_count=analysis_results['highest_count'],
+                    average_sites_per_region=analysis_results['avg_per_region'],
+                    status='success'
+                )
             )
-            session.add(city_data)
-        
-        # Store cities exceeding threshold
-        for row in analysis_results['cities_exceeding_threshold']:
-            city_exceeds = CityExceedsThreshold(
-                analysis_run_id=analysis_run.id,
-                city=row['city'],
-                region=row['region'],
-                galamsay_sites=row['sites'],
-                threshold=10
+            analysis_run_id = result.inserted_primary_key[0]
+            
+            region_ids = get_region_ids(conn, analysis_results['region_totals'])
+            
+            # Store cleaned city data. Insert parameters are generated lazily and
+            # written one batch at a time, so only INSERT_BATCH_SIZE of them exist
+            # at once (one executemany per batch)
+            city_rows = (
+                {
+                    'analysis_run_id': analysis_run_id,
+                    'city': row['city'],
+                    'region_id': region_ids[row['region']],
+                    'galamsay_sites': row['sites']
+                }
+                for row in analysis_results['cleaned_data']
             )
-            session.add(city_exceeds)
+            for batch in batched(city_rows, INSERT_BATCH_SIZE):
+                conn.execute(insert(CityData), batch)
+            
+            # Store cities exceeding threshold (already sorted by analyze(), so the
+            # position is the rank the API orders by)
+            exceeding_rows = (
+                {
+                    'analysis_run_id': analysis_run_id,
+                    'city': row['city'],
+                    'region_id': region_ids[row['region']],
+                    'galamsay_sites': row['sites'],
+                    'threshold': 10,
+                    'rank': rank
+                }
+                for rank, row in enumerate(analysis_results['cities_exceeding_threshold'], start=1)
+            )
+            for batch in batched(exceeding_rows, INSERT_BATCH_SIZE):
+                conn.execute(insert(CityExceedsThreshold), batch)
         
-        session.commit()
-        print(f"✓ Analysis saved to database with ID: {analysis_run.id}")
-        print(f"  Timestamp: {analysis_run.timestamp}")
+        print(f"✓ Analysis saved to database with ID: {analysis_run_id}")
+        print(f"  Timestamp: {timestamp}")
         
-        session.close()
         return True
     except Exception as e:
         print(f"✗ Error saving to database: {str(e)}")
@@ -213,15 +327,10 @@ def main():
     print("GALAMSAY DATA ANALYSIS")
     print("=" * 60)
     
-    # Step 1: Load data
+    # Step 1 & 2: Load and clean data (streamed, raw rows aren't kept)
     analyzer = GalamsayAnalyzer('galamsay_data.csv')
-    if not analyzer.load_csv():
-        print("✗ Failed to load CSV")
-        return
-    
-    # Step 2: Clean data
-    if not analyzer.clean_data():
-        print("✗ Failed to clean data")
+    if not analyzer.load_and_clean():
+        print("✗ Failed to load and clean CSV")
         return
     
     # Step 3: Analyze
@@ -238,7 +347,7 @@ def main():
     print(f"Region with Highest Sites: {results['region_with_highest']} ({results['highest_count']} sites)")
     print(f"Average Sites per Region: {results['avg_per_region']:.2f}")
     print(f"\nCities Exceeding Threshold (10 sites):")
-    for city in sorted(results['cities_exceeding_threshold'], key=lambda x: x['sites'], reverse=True):
+    for city in results['cities_exceeding_threshold']:
         print(f"  - {city['city']} ({city['region']}): {city['sites']} sites")
     
     print(f"\nData Quality Report:")
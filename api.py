@@ -8,13 +8,15 @@ Run this AFTER running analyze_data.py:
 Then visit: http://localhost:8000/docs
 """
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from sqlalchemy import create_engine, desc
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import sessionmaker, selectinload
 from datetime import datetime
-from typing import List, Optional
-from models import AnalysisRun, CityData, CityExceedsThreshold, get_database_url
+from typing import Any, Callable, Hashable, List, Optional
+import orjson
+from models import Base, AnalysisRun, CityData, CityExceedsThreshold, Region, create_db_engine
 from pydantic import BaseModel
 
 
@@ -38,6 +40,7 @@ class CityExceedsThresholdResponse(BaseModel):
     region: str
     galamsay_sites: int
     threshold: int
+    rank: int
     
     class Config:
         from_attributes = True
@@ -63,11 +66,65 @@ class AnalysisRunDetailResponse(AnalysisRunResponse):
     cities_exceeding_threshold: List[CityExceedsThresholdResponse]
 
 
+# ============================================================================
+# Serialization
+# ============================================================================
+# The large list/detail endpoints return these plain dicts directly as an
+# ORJSONResponse. The data comes from our own database, so re-validating
+# every row through the Pydantic models above would be wasted work; the
+# models are still used as response_model for the OpenAPI docs.
+
+# Averages are stored at full precision and rounded when they are returned
+AVERAGE_PRECISION = 2
+
+
+def round_average(value: float, precision: int = AVERAGE_PRECISION) -> float:
+    """Round a stored average for an API response."""
+    return round(value, precision)
+
+
+def analysis_to_dict(analysis: AnalysisRun) -> dict:
+    """Build the AnalysisRunResponse shape for one analysis run."""
+    return {
+        "id": analysis.id,
+        "timestamp": analysis.timestamp,
+        "total_galamsay_sites": analysis.total_galamsay_sites,
+        "region_with_highest_sites": analysis.region_with_highest_sites,
+        "highest_sites_count": analysis.highest_sites_count,
+        "average_sites_per_region": round_average(analysis.average_sites_per_region),
+        "status": analysis.status
+    }
+
+
+def analysis_detail_to_dict(analysis: AnalysisRun) -> dict:
+    """Build the AnalysisRunDetailResponse shape (relationships must be loaded)."""
+    detail = analysis_to_dict(analysis)
+    detail["city_data"] = [
+        {
+            "city": c.city,
+            "region": c.region,
+            "galamsay_sites": c.galamsay_sites
+        }
+        for c in analysis.city_data
+    ]
+    detail["cities_exceeding_threshold"] = [
+        {
+            "city": c.city,
+            "region": c.region,
+            "galamsay_sites": c.galamsay_sites,
+            "threshold": c.threshold,
+            "rank": c.rank
+        }
+        for c in analysis.cities_exceeding_threshold
+    ]
+    return detail
+
+
 # ============================================================================
 # Database Setup
 # ============================================================================
 
-engine = create_engine(get_database_url())
+engine = create_db_engine()
 Session = sessionmaker(bind=engine)
 
 def get_session():
@@ -79,6 +136,117 @@ def get_session():
         session.close()
 
 
+# ============================================================================
+# Latest-Run Cache
+# ============================================================================
+
+# The latest run only changes when analyze_data.py writes a new one, so the
+# "latest" lookups are served from memory. Every request checks the highest
+# run id (a primary-key lookup) and entries are only reloaded, and
+# re-rendered, when a new run has been saved, so a new run is visible on the
+# next request.
+_cache = {}
+
+
+def _latest_run_version():
+    """Cheap change marker for the analysis runs: the highest run id (None if none)."""
+    session = Session()
+    try:
+        return session.query(func.max(AnalysisRun.id)).scalar()
+    finally:
+        session.close()
+
+
+def cached(key: Hashable, producer: Callable[[], Any]):
+    """
+    Return the cached value for key, calling producer() when missing or when
+    a new analysis run was saved since it was built.
+    """
+    version = _latest_run_version()
+    hit = _cache.get(key)
+    if hit and hit[0] == version:
+        return hit[1]
+    
+    value = producer()
+    if value is not None:  # Don't cache "no runs yet"
+        _cache[key] = (version, value)
+    return value
+
+
+def _load_latest_analysis(with_details: bool = False):
+    """Query the most recent analysis run, optionally with its related rows."""
+    session = Session()
+    try:
+        query = session.query(AnalysisRun)
+        if with_details:
+            # Eager-load both relationships (one IN query each) so they are
+            # available after the session closes
+            query = query.options(
+                selectinload(AnalysisRun.city_data),
+                selectinload(AnalysisRun.cities_exceeding_threshold)
+            )
+        return query.order_by(desc(AnalysisRun.timestamp)).first()
+    finally:
+        session.close()
+
+
+def get_latest_analysis_cached():
+    """Most recent analysis run (summary columns only), cached until a new run is saved."""
+    return cached("latest", _load_latest_analysis)
+
+
+def _render_latest_analysis():
+    """Serialize the latest run with all details to JSON bytes (None if no runs)."""
+    latest = _load_latest_analysis(with_details=True)
+    if latest is None:
+        return None
+    return orjson.dumps(analysis_detail_to_dict(latest))
+
+
+def get_latest_analysis_json():
+    """
+    Pre-rendered JSON body for /analyses/latest, cached until a new run is saved.
+    Cache hits skip the query, the dict building and the JSON encoding.
+    """
+    return cached("latest-json", _render_latest_analysis)
+
+
+def get_analysis(analysis_id: Optional[int] = None) -> AnalysisRun:
+    """
+    The requested analysis run, or the (cached) latest one when no id is
+    given, so every endpoint agrees on which run is latest. Raises 404.
+    """
+    if not analysis_id:
+        analysis = get_latest_analysis_cached()
+        if not analysis:
+            raise HTTPException(status_code=404, detail="No analysis runs found")
+        return analysis
+    
+    session = Session()
+    try:
+        analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
+    finally:
+        session.close()
+    if not analysis:
+        raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
+    return analysis
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create any missing tables, then warm the latest-run cache so the first
+    requests skip the database. Runs at server startup, not on import.
+    """
+    Base.metadata.create_all(bind=engine)  # No-op if analyze_data.py already created the schema
+    try:
+        get_latest_analysis_cached()
+        get_latest_analysis_json()
+    except Exception as e:
+        print(f"✗ Could not preload latest analysis: {str(e)}")
+    yield
+
+
 # ============================================================================
 # FastAPI App
 # ============================================================================
@@ -86,7 +254,10 @@ def get_session():
 app = FastAPI(
     title="Galamsay Analysis API",
     description="RESTful API for accessing illegal small-scale mining (Galamsay) analysis results",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson is much faster than the stdlib encoder on the large detail payloads
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 
@@ -133,7 +304,7 @@ def list_analyses(
         if not analyses:
             raise HTTPException(status_code=404, detail="No analysis runs found")
         
-        return analyses
+        return ORJSONResponse([analysis_to_dict(a) for a in analyses])
     finally:
         session.close()
 
@@ -145,23 +316,12 @@ def get_latest_analysis():
     
     This is the most commonly used endpoint for current data.
     """
-    session = Session()
-    try:
-        latest = session.query(AnalysisRun)\
-            .order_by(desc(AnalysisRun.timestamp))\
-            .first()
-        
-        if not latest:
-            raise HTTPException(status_code=404, detail="No analysis runs found in database. Run analyze_data.py first.")
-        
-        # IMPORTANT: Access relationships while session is still open
-        # This forces SQLAlchemy to load the data before closing the session
-        city_data = list(latest.city_data)
-        cities_exceeding = list(latest.cities_exceeding_threshold)
-        
-        return latest
-    finally:
-        session.close()
+    body = get_latest_analysis_json()
+    
+    if not body:
+        raise HTTPException(status_code=404, detail="No analysis runs found in database. Run analyze_data.py first.")
+    
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/analyses/{analysis_id}", response_model=AnalysisRunDetailResponse)
@@ -173,17 +333,18 @@ def get_analysis_detail(analysis_id: int):
     """
     session = Session()
     try:
-        analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
+        analysis = session.query(AnalysisRun)\
+            .options(
+                selectinload(AnalysisRun.city_data),
+                selectinload(AnalysisRun.cities_exceeding_threshold)
+            )\
+            .filter(AnalysisRun.id == analysis_id)\
+            .first()
         
         if not analysis:
             raise HTTPException(status_code=404, detail=f"Analysis run with ID {analysis_id} not found")
         
-        # IMPORTANT: Access relationships while session is still open
-        # This forces SQLAlchemy to load the data before closing the session
-        city_data = list(analysis.city_data)
-        cities_exceeding = list(analysis.cities_exceeding_threshold)
-        
-        return analysis
+        return ORJSONResponse(analysis_detail_to_dict(analysis))
     finally:
         session.close()
 
@@ -196,24 +357,13 @@ def get_total_sites(analysis_id: Optional[int] = None):
     If analysis_id is provided, get that specific run.
     Otherwise, get from the latest analysis.
     """
-    session = Session()
-    try:
-        if analysis_id:
-            analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
-        else:
-            analysis = session.query(AnalysisRun).order_by(desc(AnalysisRun.timestamp)).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail="No analysis runs found")
-        
-        return {
-            "total_galamsay_sites": analysis.total_galamsay_sites,
-            "analysis_id": analysis.id,
-            "timestamp": analysis.timestamp
-        }
-    finally:
-        session.close()
+    analysis = get_analysis(analysis_id)
+    
+    return {
+        "total_galamsay_sites": analysis.total_galamsay_sites,
+        "analysis_id": analysis.id,
+        "timestamp": analysis.timestamp
+    }
 
 
 @app.get("/metrics/region-highest")
@@ -221,50 +371,33 @@ def get_region_with_highest_sites(analysis_id: Optional[int] = None):
     """
     Get region with the highest number of galamsay sites.
     """
-    session = Session()
-    try:
-        if analysis_id:
-            analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
-        else:
-            analysis = session.query(AnalysisRun).order_by(desc(AnalysisRun.timestamp)).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail="No analysis runs found")
-        
-        return {
-            "region": analysis.region_with_highest_sites,
-            "galamsay_sites": analysis.highest_sites_count,
-            "analysis_id": analysis.id,
-            "timestamp": analysis.timestamp
-        }
-    finally:
-        session.close()
+    analysis = get_analysis(analysis_id)
+    
+    return {
+        "region": analysis.region_with_highest_sites,
+        "galamsay_sites": analysis.highest_sites_count,
+        "analysis_id": analysis.id,
+        "timestamp": analysis.timestamp
+    }
 
 
 @app.get("/metrics/average-per-region")
-def get_average_per_region(analysis_id: Optional[int] = None):
+def get_average_per_region(
+    analysis_id: Optional[int] = None,
+    precision: int = Query(AVERAGE_PRECISION, ge=0, le=10, description="Decimal places to round the average to")
+):
     """
     Get average number of galamsay sites per region.
+    
+    The average is stored at full precision and rounded here.
     """
-    session = Session()
-    try:
-        if analysis_id:
-            analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
-        else:
-            analysis = session.query(AnalysisRun).order_by(desc(AnalysisRun.timestamp)).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail="No analysis runs found")
-        
-        return {
-            "average_sites_per_region": analysis.average_sites_per_region,
-            "analysis_id": analysis.id,
-            "timestamp": analysis.timestamp
-        }
-    finally:
-        session.close()
+    analysis = get_analysis(analysis_id)
+    
+    return {
+        "average_sites_per_region": round_average(analysis.average_sites_per_region, precision),
+        "analysis_id": analysis.id,
+        "timestamp": analysis.timestamp
+    }
 
 
 @app.get("/metrics/cities-exceeding-threshold", response_model=List[CityExceedsThresholdResponse])
@@ -276,28 +409,21 @@ def get_cities_exceeding_threshold(
     Get list of cities where galamsay sites exceed a threshold.
     
     Default threshold is 10 (from the analysis).
-    You can optionally specify a different threshold for filtering client-side results.
+    You can optionally specify a higher threshold to narrow the results.
     """
+    analysis = get_analysis(analysis_id)
+    
     session = Session()
     try:
-        if analysis_id:
-            analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
-        else:
-            analysis = session.query(AnalysisRun).order_by(desc(AnalysisRun.timestamp)).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail="No analysis runs found")
-        
-        cities = session.query(CityExceedsThreshold)\
+        query = session.query(CityExceedsThreshold)\
             .filter(CityExceedsThreshold.analysis_run_id == analysis.id)\
-            .all()
+            .order_by(CityExceedsThreshold.rank)
         
-        # Optional client-side filtering by threshold
+        # Optional stricter threshold, applied in the query
         if threshold:
-            cities = [c for c in cities if c.galamsay_sites > threshold]
+            query = query.filter(CityExceedsThreshold.galamsay_sites > threshold)
         
-        return cities
+        return query.all()
     finally:
         session.close()
 
@@ -307,20 +433,13 @@ def get_city_data(city_name: str, analysis_id: Optional[int] = None):
     """
     Get galamsay data for a specific city.
     """
+    analysis = get_analysis(analysis_id)
+    
     session = Session()
     try:
-        if analysis_id:
-            analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
-        else:
-            analysis = session.query(AnalysisRun).order_by(desc(AnalysisRun.timestamp)).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail="No analysis runs found")
-        
         city_data = session.query(CityData)\
             .filter(CityData.analysis_run_id == analysis.id)\
-            .filter(CityData.city.ilike(city_name))\
+            .filter(func.lower(CityData.city) == func.lower(city_name))\
             .first()
         
         if not city_data:
@@ -342,38 +461,39 @@ def get_region_data(region_name: str, analysis_id: Optional[int] = None):
     """
     Get all cities in a specific region from the latest or specified analysis.
     """
+    analysis = get_analysis(analysis_id)
+    
     session = Session()
     try:
-        if analysis_id:
-            analysis = session.query(AnalysisRun).filter(AnalysisRun.id == analysis_id).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail=f"Analysis ID {analysis_id} not found")
-        else:
-            analysis = session.query(AnalysisRun).order_by(desc(AnalysisRun.timestamp)).first()
-            if not analysis:
-                raise HTTPException(status_code=404, detail="No analysis runs found")
+        # Region names are matched exactly on save, so the shared regions table
+        # can hold several casings of one region; match all of them
+        region_ids = select(Region.id).where(func.lower(Region.name) == func.lower(region_name))
         
-        region_cities = session.query(CityData)\
+        # The full list is returned anyway, so the totals are computed from it
+        # rather than with a second aggregate query
+        cities = session.query(CityData.city, CityData.galamsay_sites)\
             .filter(CityData.analysis_run_id == analysis.id)\
-            .filter(CityData.region.ilike(region_name))\
+            .filter(CityData.region_id.in_(region_ids))\
+            .order_by(desc(CityData.galamsay_sites), CityData.id)\
             .all()
         
-        if not region_cities:
+        if not cities:
             raise HTTPException(status_code=404, detail=f"Region '{region_name}' not found in analysis")
         
-        total_sites = sum(c.galamsay_sites for c in region_cities)
+        total_sites = sum(galamsay_sites for _, galamsay_sites in cities)
+        number_of_cities = len(cities)
         
         return {
             "region": region_name,
             "total_sites": total_sites,
-            "number_of_cities": len(region_cities),
-            "average_per_city": total_sites / len(region_cities) if region_cities else 0,
+            "number_of_cities": number_of_cities,
+            "average_per_city": total_sites / number_of_cities,
             "cities": [
                 {
-                    "city": c.city,
-                    "galamsay_sites": c.galamsay_sites
+                    "city": city,
+                    "galamsay_sites": galamsay_sites
                 }
-                for c in sorted(region_cities, key=lambda x: x.galamsay_sites, reverse=True)
+                for city, galamsay_sites in cities
             ],
             "analysis_id": analysis.id,
             "timestamp": analysis.timestamp
@@ -3,7 +3,9 @@ Database models for Galamsay analysis.
 These are shared between the analysis script and the API.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, create_engine, event, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -28,8 +30,30 @@ class AnalysisRun(Base):
     error_message = Column(String, nullable=True)
     
     # Relationships
-    city_data = relationship("CityData", back_populates="analysis_run", cascade="all, delete-orphan")
-    cities_exceeding_threshold = relationship("CityExceedsThreshold", back_populates="analysis_run", cascade="all, delete-orphan")
+    # Ordered explicitly: the per-run indexes would otherwise decide the order
+    city_data = relationship(
+        "CityData",
+        back_populates="analysis_run",
+        cascade="all, delete-orphan",
+        order_by="CityData.id"
+    )
+    cities_exceeding_threshold = relationship(
+        "CityExceedsThreshold",
+        back_populates="analysis_run",
+        cascade="all, delete-orphan",
+        order_by="CityExceedsThreshold.rank"
+    )
+
+
+class Region(Base):
+    """
+    Lookup table of region names.
+    City rows store a small integer region_id instead of repeating the name.
+    """
+    __tablename__ = "regions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True, index=True)
 
 
 class CityData(Base):
@@ -42,11 +66,20 @@ class CityData(Base):
     id = Column(Integer, primary_key=True, index=True)
     analysis_run_id = Column(Integer, ForeignKey("analysis_runs.id"), nullable=False, index=True)
     city = Column(String, nullable=False)
-    region = Column(String, nullable=False)
+    region_id = Column(Integer, ForeignKey("regions.id"), nullable=False)
     galamsay_sites = Column(Integer, nullable=False)
     
-    # Relationship
+    # Relationships
     analysis_run = relationship("AnalysisRun", back_populates="city_data")
+    region_ref = relationship("Region", lazy="joined")
+    region = association_proxy("region_ref", "name")  # Region name as a plain string
+
+    # The API looks up cities case-insensitively and regions by id within
+    # one run, so these lookups can seek instead of scan
+    __table_args__ = (
+        Index("ix_city_data_run_city_lower", analysis_run_id, func.lower(city)),
+        Index("ix_city_data_run_region", analysis_run_id, region_id),
+    )
 
 
 class CityExceedsThreshold(Base):
@@ -59,12 +92,20 @@ class CityExceedsThreshold(Base):
     id = Column(Integer, primary_key=True, index=True)
     analysis_run_id = Column(Integer, ForeignKey("analysis_runs.id"), nullable=False, index=True)
     city = Column(String, nullable=False)
-    region = Column(String, nullable=False)
+    region_id = Column(Integer, ForeignKey("regions.id"), nullable=False)
     galamsay_sites = Column(Integer, nullable=False)
     threshold = Column(Integer, nullable=False)
+    rank = Column(Integer, nullable=False)  # 1 = most sites, assigned when the run is saved
     
-    # Relationship
+    # Relationships
     analysis_run = relationship("AnalysisRun", back_populates="cities_exceeding_threshold")
+    region_ref = relationship("Region", lazy="joined")
+    region = association_proxy("region_ref", "name")  # Region name as a plain string
+
+    # Lets the API read a run's cities in rank order straight from the index
+    __table_args__ = (
+        Index("ix_cities_exceeding_run_rank", analysis_run_id, rank),
+    )
 
 
 def get_database_url():
@@ -80,8 +121,38 @@ def get_database_url():
     return "sqlite:///./galamsay.db"  # Using SQLite for local development
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune each new SQLite connection.
+    WAL lets the API read while analyze_data.py writes, and synchronous=NORMAL
+    only fsyncs at checkpoints instead of on every commit.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+def create_db_engine(database_url: str = None, **kwargs):
+    """
+    Create the SQLAlchemy engine used by both the analysis script and the API.
+    SQLite connections get the PRAGMAs from _set_sqlite_pragmas(); psycopg2
+    (Postgres/Supabase) batches executemany calls into multi-row statements.
+    """
+    url = make_url(database_url or get_database_url())
+    if url.get_driver_name() == "psycopg2":
+        kwargs.setdefault("executemany_mode", "values_plus_batch")
+    
+    engine = create_engine(url, **kwargs)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
 def create_tables():
     """Create all tables in the database."""
-    engine = create_engine(get_database_url())
+    engine = create_db_engine()
     Base.metadata.create_all(bind=engine)
     print("✓ Database tables created successfully")
\ No newline at end of file
@@ -4,30 +4,39 @@ Test suite for Galamsay analysis project.
 Run tests with:
     pytest test_galamsay.py -v
 
+Only the quick unit tests (no database, no API client):
+    pytest test_galamsay.py -m fast
+
+In parallel (requires pytest-xdist):
+    pytest test_galamsay.py -n auto --dist loadgroup
+
 For coverage report:
     pytest test_galamsay.py --cov=. --cov-report=html
 """
 
+import asyncio
+import csv
+import io
 import pytest
-import os
-import tempfile
+import shutil
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from analyze_data import GalamsayAnalyzer
-from models import Base, AnalysisRun, CityData, CityExceedsThreshold, get_database_url
-from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+import analyze_data
+from analyze_data import GalamsayAnalyzer, get_region_ids, save_analysis_to_database
+from models import Base, AnalysisRun, CityData, CityExceedsThreshold, Region, create_db_engine, get_database_url
+from httpx import ASGITransport, AsyncClient
+import api
 from api import app
 
 
 # ============================================================================
-# Fixtures (Setup for tests)
+# Test Data
 # ============================================================================
 
-@pytest.fixture
-def temp_csv():
-    """Create a temporary CSV file for testing."""
-    content = """City,Region,Number_of_Galamsay_Sites
+CLEAN_CSV = b"""City,Region,Number_of_Galamsay_Sites
 Kumasi,Ashanti,25
 Accra,Greater Accra,20
 Takoradi,Western,18
@@ -35,21 +44,8 @@ Tamale,Northern,7
 Bolgatanga,Upper East,5
 Obuasi,Ashanti,10
 """
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
-        f.write(content)
-        temp_path = f.name
-    
-    yield temp_path
-    
-    # Cleanup
-    if os.path.exists(temp_path):
-        os.remove(temp_path)
 
-
-@pytest.fixture
-def temp_csv_with_errors():
-    """Create a CSV with intentional data quality issues."""
-    content = """City,Region,Number_of_Galamsay_Sites
+DIRTY_CSV = b"""City,Region,Number_of_Galamsay_Sites
 Accra,Greater Accra,30
 Unknown City,Some Region,10
 Kumasi,Ashanti,abc
@@ -57,66 +53,218 @@ Tamale,Northern,-5
 Cape Coast,Central,1000
 Valid City,Eastern,15
 """
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
-        f.write(content)
-        temp_path = f.name
+
+# The same data already parsed, for tests that don't exercise CSV loading
+CLEAN_ROWS = list(csv.DictReader(io.StringIO(CLEAN_CSV.decode())))
+DIRTY_ROWS = list(csv.DictReader(io.StringIO(DIRTY_CSV.decode())))
+
+# Rows in a different order from their site counts (smallest threshold city
+# first, largest last), so ordering has to come from the rank, not insertion
+UNSORTED_ROWS = [
+    {"City": "Takoradi", "Region": "Western", "Number_of_Galamsay_Sites": "12"},
+    {"City": "Tamale", "Region": "Northern", "Number_of_Galamsay_Sites": "7"},
+    {"City": "Accra", "Region": "Greater Accra", "Number_of_Galamsay_Sites": "20"},
+    {"City": "Kumasi", "Region": "Ashanti", "Number_of_Galamsay_Sites": "25"},
+]
+
+METRICS_ENDPOINTS = [
+    "/metrics/total-sites",
+    "/metrics/region-highest",
+    "/metrics/average-per-region"
+]
+
+# Schema DDL rendered once at import, run with a single executescript()
+_SCHEMA_SQL = "\n".join(
+    f"{str(ddl.compile(dialect=sqlite.dialect())).strip()};"
+    for table in Base.metadata.sorted_tables
+    for ddl in [
+        CreateTable(table),
+        # table.indexes is a set; sort so the script (and the file it builds) is stable
+        *(CreateIndex(index) for index in sorted(table.indexes, key=lambda index: index.name))
+    ]
+)
+
+# Fixed run timestamp (naive UTC, like datetime.utcnow()) so the seeded
+# database is identical on every run
+SEED_TIMESTAMP = datetime(2024, 1, 1)
+
+# Seed rows for the test database (region given by name, resolved to an id on insert)
+ANALYSIS_ROW = {
+    "timestamp": SEED_TIMESTAMP,
+    "total_galamsay_sites": 85,
+    "region_with_highest_sites": "Ashanti",
+    "highest_sites_count": 25,
+    "average_sites_per_region": 17.0,
+    "status": "success"
+}
+
+CITY_ROWS = [
+    {"city": "Accra", "region": "Greater Accra", "galamsay_sites": 30},
+    {"city": "Kumasi", "region": "Ashanti", "galamsay_sites": 25},
+    {"city": "Takoradi", "region": "Western", "galamsay_sites": 18},
+    {"city": "Tamale", "region": "Northern", "galamsay_sites": 7},
+    {"city": "Bolgatanga", "region": "Upper East", "galamsay_sites": 5},
+]
+
+# Inserted out of rank order so loading in rank order depends on the rank column
+EXCEEDING_ROWS = [
+    {"city": "Takoradi", "region": "Western", "galamsay_sites": 18, "threshold": 10, "rank": 3},
+    {"city": "Accra", "region": "Greater Accra", "galamsay_sites": 30, "threshold": 10, "rank": 1},
+    {"city": "Kumasi", "region": "Ashanti", "galamsay_sites": 25, "threshold": 10, "rank": 2},
+]
+
+
+def _insert_params(rows, analysis_id, region_ids):
+    """Turn seed rows into insert parameters for one analysis run."""
+    return [
+        {
+            **{key: value for key, value in row.items() if key != "region"},
+            "analysis_run_id": analysis_id,
+            "region_id": region_ids[row["region"]]
+        }
+        for row in rows
+    ]
+
+
+# ============================================================================
+# Fixtures (Setup for tests)
+# ============================================================================
+
+@pytest.fixture
+def temp_csv_with_errors(tmp_path):
+    """Create a CSV with intentional data quality issues."""
+    path = tmp_path / "dirty.csv"
+    path.write_bytes(DIRTY_CSV)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def clean_results():
+    """Clean and analyze CLEAN_ROWS once per module and share the results."""
+    analyzer = GalamsayAnalyzer.from_raw_rows(CLEAN_ROWS)
+    assert analyzer.clean_data() is True
+    return analyzer.analyze()
+
+
+@pytest.fixture
+def analyzer():
+    """Analyzer for row-level tests that never touch the file."""
+    return GalamsayAnalyzer("dummy.csv")
+
+
+def _create_test_engine(path):
+    """
+    SQLite engine for test databases: journal kept in memory and no fsync.
+    Test databases are thrown away, so durability isn't needed.
+    """
+    engine = create_engine(f"sqlite:///{path}")
     
-    yield temp_path
+    @event.listens_for(engine, "connect")
+    def _set_test_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
     
-    if os.path.exists(temp_path):
-        os.remove(temp_path)
+    return engine
 
 
-@pytest.fixture
-def test_database():
-    """Create an in-memory SQLite database for testing."""
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(bind=engine)
+@pytest.fixture(scope="session")
+def _db_template(tmp_path_factory):
+    """
+    Build and populate a SQLite test database file once per session.
+    test_database copies this file instead of repeating the DDL and inserts.
+    """
+    path = tmp_path_factory.mktemp("db") / "template.db"
+    engine = _create_test_engine(path)
+    raw = engine.raw_connection()
+    try:
+        raw.executescript(_SCHEMA_SQL)
+        raw.commit()
+    finally:
+        raw.close()
     
-    # Populate with test data
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    # Populate with test data: one executemany per table, no ORM unit of work
+    with engine.begin() as conn:
+        analysis_id = conn.execute(insert(AnalysisRun).values(**ANALYSIS_ROW)).inserted_primary_key[0]
+        region_ids = get_region_ids(conn, {row["region"] for row in CITY_ROWS})
+        conn.execute(insert(CityData), _insert_params(CITY_ROWS, analysis_id, region_ids))
+        conn.execute(insert(CityExceedsThreshold), _insert_params(EXCEEDING_ROWS, analysis_id, region_ids))
     
-    # Create a test analysis run
-    analysis = AnalysisRun(
-        timestamp=datetime.utcnow(),
-        total_galamsay_sites=85,
-        region_with_highest_sites="Ashanti",
-        highest_sites_count=25,
-        average_sites_per_region=17.0,
-        status="success"
-    )
-    session.add(analysis)
-    session.flush()
+    engine.dispose()
     
-    # Add test city data
-    cities = [
-        CityData(analysis_run_id=analysis.id, city="Accra", region="Greater Accra", galamsay_sites=30),
-        CityData(analysis_run_id=analysis.id, city="Kumasi", region="Ashanti", galamsay_sites=25),
-        CityData(analysis_run_id=analysis.id, city="Takoradi", region="Western", galamsay_sites=18),
-        CityData(analysis_run_id=analysis.id, city="Tamale", region="Northern", galamsay_sites=7),
-        CityData(analysis_run_id=analysis.id, city="Bolgatanga", region="Upper East", galamsay_sites=5),
-    ]
-    session.add_all(cities)
+    return path
+
+
+@pytest.fixture
+def test_database(_db_template, tmp_path):
+    """Independent, writable copy of the populated test database for one test."""
+    path = tmp_path / "test.db"
+    shutil.copyfile(_db_template, path)
+    engine = _create_test_engine(path)
     
-    # Add cities exceeding threshold
-    exceeding = [
-        CityExceedsThreshold(analysis_run_id=analysis.id, city="Accra", region="Greater Accra", galamsay_sites=30, threshold=10),
-        CityExceedsThreshold(analysis_run_id=analysis.id, city="Kumasi", region="Ashanti", galamsay_sites=25, threshold=10),
-        CityExceedsThreshold(analysis_run_id=analysis.id, city="Takoradi", region="Western", galamsay_sites=18, threshold=10),
-    ]
-    session.add_all(exceeding)
-    session.commit()
+    yield engine
     
-    yield engine, session
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(test_database):
+    """Session on this test's copy of the test database."""
+    session = Session(bind=test_database)
+    
+    yield session
     
     session.close()
 
 
+@pytest.fixture(scope="module")
+def anyio_backend():
+    """Run async tests (pytest.mark.anyio) on asyncio only."""
+    return "asyncio"
+
+
+@pytest.fixture(scope="module")
+async def api_client(anyio_backend, tmp_path_factory):
+    """
+    Async client shared by the module, calling the ASGI app in-process on
+    the test's event loop (no thread hop per request like TestClient).
+    The app runs against an empty temp database instead of ./galamsay.db,
+    and its lifespan (schema creation, cache warm-up) runs once for all API tests.
+    """
+    db_engine = create_db_engine(f"sqlite:///{tmp_path_factory.mktemp('api') / 'empty.db'}")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(api, "engine", db_engine)
+        mp.setattr(api, "Session", sessionmaker(bind=db_engine))
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                yield client
+    db_engine.dispose()
+
+
 @pytest.fixture
-def api_client():
-    """Create a FastAPI test client."""
-    return TestClient(app)
+def api_database(tmp_path, monkeypatch):
+    """Point save_analysis_to_database() and the API at the same temp database."""
+    db_url = f"sqlite:///{tmp_path / 'api.db'}"
+    monkeypatch.setattr(analyze_data, "get_database_url", lambda: db_url)
+    monkeypatch.setattr(api, "Session", sessionmaker(bind=create_db_engine(db_url)))
+    monkeypatch.setattr(api, "_cache", {})
+    return db_url
+
+
+@pytest.fixture
+def saved_analysis(clean_results, api_database):
+    """Save the CLEAN_CSV analysis to a temp database and point the API at it."""
+    assert save_analysis_to_database(clean_results) is True
+    return api_database
+
+
+def analyze_rows(rows):
+    """Clean and analyze CSV-style rows, returning the analysis results."""
+    analyzer = GalamsayAnalyzer.from_raw_rows(rows)
+    assert analyzer.clean_data() is True
+    return analyzer.analyze()
 
 
 # ============================================================================
@@ -126,75 +274,72 @@ def api_client():
 class TestDataCleaning:
     """Tests for the GalamsayAnalyzer.clean_row() method."""
     
-    def test_clean_valid_row(self):
-        """Valid row should be cleaned without errors."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'Accra', 'Region': 'Greater Accra', 'Number_of_Galamsay_Sites': '30'}
-        
-        cleaned = analyzer.clean_row(row)
-        
-        assert cleaned is not None
-        assert cleaned['city'] == 'Accra'
-        assert cleaned['region'] == 'Greater Accra'
-        assert cleaned['sites'] == 30
+    pytestmark = pytest.mark.fast
     
-    def test_clean_row_with_whitespace(self):
-        """Row with leading/trailing whitespace should be stripped."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': '  Accra  ', 'Region': '  Greater Accra  ', 'Number_of_Galamsay_Sites': '  30  '}
-        
+    @pytest.mark.parametrize("row,expected", [
+        pytest.param(
+            {'City': 'Accra', 'Region': 'Greater Accra', 'Number_of_Galamsay_Sites': '30'},
+            {'city': 'Accra', 'region': 'Greater Accra', 'sites': 30},
+            id="valid"
+        ),
+        pytest.param(
+            {'City': '  Accra  ', 'Region': '  Greater Accra  ', 'Number_of_Galamsay_Sites': '  30  '},
+            {'city': 'Accra', 'region': 'Greater Accra', 'sites': 30},
+            id="whitespace-stripped"
+        ),
+        pytest.param(
+            {'City': 'SomeCity', 'Region': 'SomeRegion', 'Number_of_Galamsay_Sites': '0'},
+            {'city': 'SomeCity', 'region': 'SomeRegion', 'sites': 0},
+            id="zero-sites"
+        ),
+        pytest.param(
+            # Flagged as a warning, but still accepted
+            {'City': 'SomeCity', 'Region': 'SomeRegion', 'Number_of_Galamsay_Sites': '999'},
+            {'city': 'SomeCity', 'region': 'SomeRegion', 'sites': 999},
+            id="very-large-number"
+        ),
+        pytest.param(
+            {'City': 'Unknown City', 'Region': 'Some Region', 'Number_of_Galamsay_Sites': '10'},
+            None,
+            id="unknown-city"
+        ),
+        pytest.param(
+            {'City': 'Kumasi', 'Region': 'Ashanti', 'Number_of_Galamsay_Sites': 'abc'},
+            None,
+            id="non-numeric-sites"
+        ),
+        pytest.param(
+            {'City': 'Tamale', 'Region': 'Northern', 'Number_of_Galamsay_Sites': '-5'},
+            None,
+            id="negative-sites"
+        ),
+        pytest.param(
+            {'City': '', 'Region': 'Some Region', 'Number_of_Galamsay_Sites': '10'},
+            None,
+            id="missing-city"
+        ),
+        pytest.param(
+            {'City': 'Techiman', 'Region': 'Invalid Region', 'Number_of_Galamsay_Sites': '16'},
+            None,
+            id="invalid-region"
+        ),
+    ])
+    def test_clean_row(self, analyzer, row, expected):
+        """Valid rows are normalised; invalid rows are rejected with an error."""
         cleaned = analyzer.clean_row(row)
         
-        assert cleaned is not None
-        assert cleaned['city'] == 'Accra'
-        assert cleaned['sites'] == 30
+        assert cleaned == expected
+        if expected is None:
+            assert len(analyzer.errors) > 0
     
-    def test_clean_row_rejects_unknown_city(self):
-        """Row with 'Unknown City' should be rejected."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'Unknown City', 'Region': 'Some Region', 'Number_of_Galamsay_Sites': '10'}
-        
-        cleaned = analyzer.clean_row(row)
-        
-        assert cleaned is None
-        assert len(analyzer.errors) > 0
-    
-    def test_clean_row_rejects_invalid_sites_count(self):
-        """Row with non-numeric sites count should be rejected."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'Kumasi', 'Region': 'Ashanti', 'Number_of_Galamsay_Sites': 'abc'}
-        
-        cleaned = analyzer.clean_row(row)
-        
-        assert cleaned is None
-        assert len(analyzer.errors) > 0
-    
-    def test_clean_row_rejects_negative_sites(self):
-        """Row with negative sites count should be rejected."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'Tamale', 'Region': 'Northern', 'Number_of_Galamsay_Sites': '-5'}
-        
-        cleaned = analyzer.clean_row(row)
-        
-        assert cleaned is None
-    
-    def test_clean_row_rejects_missing_city(self):
-        """Row with missing city should be rejected."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': '', 'Region': 'Some Region', 'Number_of_Galamsay_Sites': '10'}
-        
-        cleaned = analyzer.clean_row(row)
-        
-        assert cleaned is None
-    
-    def test_clean_row_rejects_invalid_region(self):
-        """Row with 'Invalid Region' should be rejected."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'Techiman', 'Region': 'Invalid Region', 'Number_of_Galamsay_Sites': '16'}
-        
+    def test_clean_row_rejects_short_row(self, analyzer):
+        """Row missing trailing fields (None values from csv) should be rejected."""
+        row = {'City': 'Accra', 'Region': None, 'Number_of_Galamsay_Sites': None}
+
         cleaned = analyzer.clean_row(row)
-        
+
         assert cleaned is None
+        assert analyzer.errors[0].startswith("Invalid region")
 
 
 # ============================================================================
@@ -204,22 +349,48 @@ class TestDataCleaning:
 class TestCSVLoading:
     """Tests for CSV file loading."""
     
-    def test_load_valid_csv(self, temp_csv):
-        """Valid CSV should load successfully."""
-        analyzer = GalamsayAnalyzer(temp_csv)
+    pytestmark = pytest.mark.fast
+    
+    @pytest.mark.parametrize("content, expected, rows, first_city", [
+        (CLEAN_CSV, True, 6, 'Kumasi'),
+        (None, False, 0, None),
+    ], ids=["valid", "nonexistent-file"])
+    def test_load_csv(self, tmp_path, content, expected, rows, first_city):
+        """Valid CSV should load; a missing file should fail gracefully."""
+        path = tmp_path / "data.csv"
+        if content is not None:
+            path.write_bytes(content)
+        
+        analyzer = GalamsayAnalyzer(str(path))
         result = analyzer.load_csv()
         
-        assert result is True
-        assert len(analyzer.raw_data) == 6
-        assert analyzer.raw_data[0]['City'] == 'Kumasi'
+        assert result is expected
+        assert len(analyzer.raw_data) == rows
+        if expected:
+            assert analyzer.raw_data[0]['City'] == first_city
+        else:
+            assert len(analyzer.errors) > 0
+
+    def test_from_raw_rows_matches_load_csv(self, tmp_path):
+        """Pre-parsed rows should give the same raw data as loading the file."""
+        path = tmp_path / "clean.csv"
+        path.write_bytes(CLEAN_CSV)
+        loaded = GalamsayAnalyzer(str(path))
+        assert loaded.load_csv() is True
+        
+        assert GalamsayAnalyzer.from_raw_rows(CLEAN_ROWS).raw_data == loaded.raw_data
     
-    def test_load_nonexistent_file(self):
-        """Loading non-existent file should fail gracefully."""
-        analyzer = GalamsayAnalyzer('nonexistent.csv')
+    def test_load_csv_missing_columns(self, tmp_path):
+        """CSV without the expected header should fail before reading rows."""
+        path = tmp_path / "bad_header.csv"
+        path.write_bytes(b"City,Sites\nAccra,30\n")
+
+        analyzer = GalamsayAnalyzer(str(path))
         result = analyzer.load_csv()
-        
+
         assert result is False
-        assert len(analyzer.errors) > 0
+        assert analyzer.raw_data == []
+        assert "Region" in analyzer.errors[0]
 
 
 # ============================================================================
@@ -229,26 +400,22 @@ class TestCSVLoading:
 class TestAnalysis:
     """Tests for the full analysis pipeline."""
     
-    def test_analysis_pipeline_with_clean_data(self, temp_csv):
+    # Keep on one xdist worker so the module-scoped pipeline fixture runs once
+    pytestmark = [pytest.mark.slow, pytest.mark.xdist_group("db")]
+    
+    def test_analysis_pipeline_with_clean_data(self, clean_results):
         """Complete analysis pipeline should produce correct results."""
-        analyzer = GalamsayAnalyzer(temp_csv)
-        
-        # Execute pipeline
-        assert analyzer.load_csv() is True
-        assert analyzer.clean_data() is True
-        results = analyzer.analyze()
+        results = clean_results
         
-        # Verify results
         assert results['total_sites'] == 85
         assert results['region_with_highest'] == 'Ashanti'  # Ashanti has 25+10=35 sites
         assert results['highest_count'] == 35
         assert len(results['cleaned_data']) == 6
     
-    def test_analysis_handles_dirty_data(self, temp_csv_with_errors):
+    def test_analysis_handles_dirty_data(self):
         """Analysis should handle and reject dirty data."""
-        analyzer = GalamsayAnalyzer(temp_csv_with_errors)
+        analyzer = GalamsayAnalyzer.from_raw_rows(DIRTY_ROWS)
         
-        assert analyzer.load_csv() is True
         assert analyzer.clean_data() is True
         
         # Should have cleaned 3 valid records (Accra, Cape Coast with 1000, Valid City)
@@ -258,28 +425,87 @@ class TestAnalysis:
         # Should have errors for the invalid records
         assert len(analyzer.errors) >= 3
     
-    def test_cities_exceeding_threshold(self, temp_csv):
-        """Should correctly identify cities exceeding threshold."""
-        analyzer = GalamsayAnalyzer(temp_csv)
-        analyzer.load_csv()
-        analyzer.clean_data()
-        results = analyzer.analyze()
+    def test_load_and_clean_streams_rows(self, temp_csv_with_errors):
+        """Streaming load should clean the same rows without keeping raw data."""
+        analyzer = GalamsayAnalyzer(temp_csv_with_errors)
+
+        assert analyzer.load_and_clean() is True
+        assert analyzer.raw_data == []
+        assert len(analyzer.cleaned_data) == 3
+        assert len(analyzer.errors) >= 3
+    
+    def test_cities_exceeding_threshold(self):
+        """Should correctly identify cities exceeding threshold, most sites first."""
+        exceeding = analyze_rows(UNSORTED_ROWS)['cities_exceeding_threshold']
         
-        exceeding = results['cities_exceeding_threshold']
+        # With threshold=10: Takoradi, Accra, Kumasi in input order, ranked by sites
+        assert [c['city'] for c in exceeding] == ['Kumasi', 'Accra', 'Takoradi']
+    
+    def test_saved_ranks_follow_site_order(self, api_database):
+        """Stored ranks should order threshold cities by sites, not by input order."""
+        assert save_analysis_to_database(analyze_rows(UNSORTED_ROWS)) is True
         
-        # With threshold=10, should have Accra, Kumasi, Takoradi
-        assert len(exceeding) == 3
-        assert any(c['city'] == 'Accra' for c in exceeding)
+        session = sessionmaker(bind=create_db_engine(api_database))()
+        try:
+            stored = session.query(CityExceedsThreshold.city, CityExceedsThreshold.rank)\
+                .order_by(CityExceedsThreshold.id)\
+                .all()
+        finally:
+            session.close()
+        assert stored == [('Kumasi', 1), ('Accra', 2), ('Takoradi', 3)]
     
-    def test_average_calculation(self, temp_csv):
+    def test_average_calculation(self, clean_results):
         """Average sites per region should be calculated correctly."""
-        analyzer = GalamsayAnalyzer(temp_csv)
-        analyzer.load_csv()
-        analyzer.clean_data()
-        results = analyzer.analyze()
-        
         # 85 total sites / 5 regions = 17
-        assert results['avg_per_region'] == 17.0
+        assert clean_results['avg_per_region'] == 17.0
+
+    def test_save_analysis_to_database(self, clean_results, tmp_path, monkeypatch):
+        """Saved analysis should store every cleaned row and threshold city."""
+        db_url = f"sqlite:///{tmp_path / 'galamsay.db'}"
+        monkeypatch.setattr(analyze_data, "get_database_url", lambda: db_url)
+        monkeypatch.setattr(analyze_data, "INSERT_BATCH_SIZE", 4)  # 6 rows -> 2 batches
+
+        assert save_analysis_to_database(clean_results) is True
+
+        session = sessionmaker(bind=create_db_engine(db_url))()
+        try:
+            assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            run = session.query(AnalysisRun).one()
+            assert run.total_galamsay_sites == 85
+            assert session.query(CityData).filter(CityData.analysis_run_id == run.id).count() == 6
+            assert session.query(CityExceedsThreshold).filter(CityExceedsThreshold.analysis_run_id == run.id).count() == 3
+            assert session.query(Region).count() == 5
+        finally:
+            session.close()
+
+        # A second run reuses the existing regions
+        assert save_analysis_to_database(clean_results) is True
+        session = sessionmaker(bind=create_db_engine(db_url))()
+        try:
+            assert session.query(AnalysisRun).count() == 2
+            assert session.query(Region).count() == 5
+        finally:
+            session.close()
+
+
+# ============================================================================
+# Database Model Tests
+# ============================================================================
+
+class TestModels:
+    """Tests for the ORM models against copies of the test database."""
+
+    pytestmark = pytest.mark.slow
+
+    def test_city_data_exposes_region_name(self, db_session):
+        """CityData.region should read the name through the regions table."""
+        kumasi = db_session.query(CityData).filter(CityData.city == "Kumasi").one()
+        assert kumasi.region == "Ashanti"
+
+    def test_threshold_cities_load_in_rank_order(self, db_session):
+        """The relationship should return cities ordered by rank."""
+        analysis = db_session.query(AnalysisRun).one()
+        assert [c.city for c in analysis.cities_exceeding_threshold] == ["Accra", "Kumasi", "Takoradi"]
 
 
 # ============================================================================
@@ -289,37 +515,199 @@ class TestAnalysis:
 class TestAPI:
     """Tests for FastAPI endpoints."""
     
-    def test_root_endpoint(self, api_client):
+    # Keep on one xdist worker so the app/client startup is paid once
+    pytestmark = [pytest.mark.slow, pytest.mark.anyio, pytest.mark.xdist_group("db")]
+    
+    async def test_root_endpoint(self, api_client):
         """Root endpoint should return API information."""
-        response = api_client.get("/")
+        response = await api_client.get("/")
         assert response.status_code == 200
         assert "endpoints" in response.json()
     
-    def test_health_check(self, api_client):
+    async def test_health_check(self, api_client):
         """Health check endpoint should be accessible."""
-        response = api_client.get("/health")
+        response = await api_client.get("/health")
         assert response.status_code == 200
         assert response.json()["status"] in ["healthy", "unhealthy"]
     
-    def test_list_analyses_empty(self, api_client):
+    async def test_list_analyses_empty(self, api_client):
         """Should handle request when no analyses exist."""
-        response = api_client.get("/analyses")
+        response = await api_client.get("/analyses")
         # This will return 404 in a real scenario with empty database
         assert response.status_code in [200, 404]
     
-    def test_metrics_endpoints_structure(self, api_client):
+    @pytest.mark.parametrize("endpoint", METRICS_ENDPOINTS)
+    async def test_metrics_endpoints_structure(self, api_client, endpoint):
         """Metrics endpoints should return correct structure."""
         # These will return 404 if database is empty, which is expected
-        endpoints = [
-            "/metrics/total-sites",
-            "/metrics/region-highest",
-            "/metrics/average-per-region"
-        ]
-        
+        response = await api_client.get(endpoint)
+        # Accept either 200 (with data) or 404 (no data)
+        assert response.status_code in [200, 404]
+
+    async def test_metrics_endpoints_concurrently(self, api_client, saved_analysis):
+        """All metrics endpoints should answer when requested at the same time."""
+        responses = await asyncio.gather(*(api_client.get(endpoint) for endpoint in METRICS_ENDPOINTS))
+
+        assert [r.status_code for r in responses] == [200] * len(METRICS_ENDPOINTS)
+        assert responses[0].json()["total_galamsay_sites"] == 85
+
+    async def test_latest_analysis_includes_related_data(self, api_client, saved_analysis):
+        """Latest analysis should return its city data and threshold cities."""
+        response = await api_client.get("/analyses/latest")
+        assert response.status_code == 200
+
+        body = response.json()
+        assert body["total_galamsay_sites"] == 85
+        assert len(body["city_data"]) == 6
+        assert len(body["cities_exceeding_threshold"]) == 3
+
+    async def test_city_data_keeps_input_order(self, api_client, api_database):
+        """city_data should come back in the order the rows were analyzed."""
+        assert save_analysis_to_database(analyze_rows(UNSORTED_ROWS)) is True
+        expected = [row["City"] for row in UNSORTED_ROWS]
+
+        latest = (await api_client.get("/analyses/latest")).json()
+        assert [c["city"] for c in latest["city_data"]] == expected
+        detail = (await api_client.get(f"/analyses/{latest['id']}")).json()
+        assert [c["city"] for c in detail["city_data"]] == expected
+
+    async def test_detail_matches_response_models(self, api_client, saved_analysis):
+        """Hand-built detail and list payloads should still match the Pydantic models."""
+        latest = (await api_client.get("/analyses/latest")).json()
+        detail = (await api_client.get(f"/analyses/{latest['id']}")).json()
+
+        assert api.AnalysisRunDetailResponse.model_validate(detail).model_dump(mode="json") == detail
+        assert detail == latest
+
+        listed = (await api_client.get("/analyses")).json()
+        assert [api.AnalysisRunResponse.model_validate(a).model_dump(mode="json") for a in listed] == listed
+
+    async def test_latest_metrics_are_cached(self, api_client, saved_analysis, monkeypatch):
+        """Repeat requests for the latest run should not hit the database."""
+        assert (await api_client.get("/metrics/total-sites")).status_code == 200
+
+        def fail():
+            raise AssertionError("database queried for cached latest run")
+
+        monkeypatch.setattr(api, "_load_latest_analysis", lambda with_details=False: fail())
+
+        response = await api_client.get("/metrics/total-sites")
+        assert response.status_code == 200
+        assert response.json()["total_galamsay_sites"] == 85
+
+    async def test_latest_cache_reused_until_new_run(self, api_client, saved_analysis, clean_results, monkeypatch):
+        """The cached body is reused while no newer run exists, and replaced on the next request after one is saved."""
+        first = (await api_client.get("/analyses/latest")).json()
+
+        def fail():
+            raise AssertionError("latest run re-rendered although no new run was saved")
+
+        with monkeypatch.context() as mp:
+            mp.setattr(api, "_render_latest_analysis", fail)
+            assert (await api_client.get("/analyses/latest")).json() == first
+
+        assert save_analysis_to_database(clean_results) is True
+
+        assert (await api_client.get("/analyses/latest")).json()["id"] != first["id"]
+
+    async def test_latest_run_endpoints_agree_after_new_run(self, api_client, saved_analysis, clean_results):
+        """Every endpoint should switch to a newly saved run on the next request."""
+        endpoints = [*METRICS_ENDPOINTS, "/city/accra", "/region/ashanti"]
+        for endpoint in endpoints:  # warm the cache
+            assert (await api_client.get(endpoint)).status_code == 200
+
+        assert save_analysis_to_database(clean_results) is True
+        latest_id = (await api_client.get("/analyses/latest")).json()["id"]
+
         for endpoint in endpoints:
-            response = api_client.get(endpoint)
-            # Accept either 200 (with data) or 404 (no data)
-            assert response.status_code in [200, 404]
+            assert (await api_client.get(endpoint)).json()["analysis_id"] == latest_id, endpoint
+
+    async def test_region_aggregates(self, api_client, api_database):
+        """Region endpoint should return totals and cities ordered by sites."""
+        rows = [  # Inserted in ascending site order
+            {"City": "Obuasi", "Region": "Ashanti", "Number_of_Galamsay_Sites": "10"},
+            {"City": "Accra", "Region": "Greater Accra", "Number_of_Galamsay_Sites": "20"},
+            {"City": "Kumasi", "Region": "Ashanti", "Number_of_Galamsay_Sites": "25"},
+        ]
+        assert save_analysis_to_database(analyze_rows(rows)) is True
+
+        response = await api_client.get("/region/ashanti")
+        assert response.status_code == 200
+
+        body = response.json()
+        assert body["total_sites"] == 35
+        assert body["number_of_cities"] == 2
+        assert body["average_per_city"] == 17.5
+        assert [c["city"] for c in body["cities"]] == ["Kumasi", "Obuasi"]
+
+    async def test_region_matches_every_stored_casing(self, api_client, api_database):
+        """Runs that spell a region differently should still be found by name."""
+        rows = [{"City": "Kumasi", "Region": "ashanti", "Number_of_Galamsay_Sites": "25"}]
+        assert save_analysis_to_database(analyze_rows(rows)) is True
+        rows = [{"City": "Obuasi", "Region": "Ashanti", "Number_of_Galamsay_Sites": "10"}]
+        assert save_analysis_to_database(analyze_rows(rows)) is True
+
+        response = await api_client.get("/region/Ashanti")
+        assert response.status_code == 200
+        assert [c["city"] for c in response.json()["cities"]] == ["Obuasi"]
+
+    async def test_cities_exceeding_threshold_in_rank_order(self, api_client, api_database):
+        """Threshold cities come back by rank; a higher threshold narrows the list."""
+        assert save_analysis_to_database(analyze_rows(UNSORTED_ROWS)) is True
+
+        response = await api_client.get("/metrics/cities-exceeding-threshold")
+        assert response.status_code == 200
+        assert [(c["city"], c["rank"]) for c in response.json()] == [("Kumasi", 1), ("Accra", 2), ("Takoradi", 3)]
+
+        response = await api_client.get("/metrics/cities-exceeding-threshold", params={"threshold": 19})
+        assert response.status_code == 200
+        assert [c["city"] for c in response.json()] == ["Kumasi", "Accra"]
+
+    async def test_average_per_region_precision(self, api_client, saved_analysis):
+        """Average is rounded at read time to the requested precision."""
+        response = await api_client.get("/metrics/average-per-region", params={"precision": 0})
+        assert response.status_code == 200
+        assert response.json()["average_sites_per_region"] == 17
+
+    async def test_analysis_endpoints_round_average(self, api_client, api_database):
+        """A non-terminating average is stored in full but returned to 2 places."""
+        rows = [
+            {"City": "Accra", "Region": "Greater Accra", "Number_of_Galamsay_Sites": "10"},
+            {"City": "Kumasi", "Region": "Ashanti", "Number_of_Galamsay_Sites": "5"},
+            {"City": "Tamale", "Region": "Northern", "Number_of_Galamsay_Sites": "5"},
+        ]
+        assert save_analysis_to_database(analyze_rows(rows)) is True  # 20 / 3 regions
+
+        latest = (await api_client.get("/analyses/latest")).json()
+        assert latest["average_sites_per_region"] == 6.67
+        assert (await api_client.get(f"/analyses/{latest['id']}")).json()["average_sites_per_region"] == 6.67
+        assert (await api_client.get("/analyses")).json()[0]["average_sites_per_region"] == 6.67
+        response = await api_client.get("/metrics/average-per-region", params={"precision": 4})
+        assert response.json()["average_sites_per_region"] == 6.6667
+
+    async def test_startup_preloads_latest_analysis(self, api_client, saved_analysis, monkeypatch):
+        """App startup should warm the cache so /analyses/latest skips the database."""
+        async with app.router.lifespan_context(app):
+            monkeypatch.setattr(api, "_load_latest_analysis", lambda with_details=False: None)
+
+            response = await api_client.get("/analyses/latest")
+            assert response.status_code == 200
+            assert response.json()["total_galamsay_sites"] == 85
+
+    async def test_city_lookup_is_case_insensitive(self, api_client, saved_analysis):
+        """City lookup should match regardless of case."""
+        response = await api_client.get("/city/KUMASI")
+        assert response.status_code == 200
+        assert response.json()["galamsay_sites"] == 25
+
+    async def test_city_lookup_with_non_ascii_name(self, api_client, api_database):
+        """The exact stored name should match even where SQLite's lower() doesn't fold."""
+        rows = [{"City": "Ébo", "Region": "Central", "Number_of_Galamsay_Sites": "4"}]
+        assert save_analysis_to_database(analyze_rows(rows)) is True
+
+        response = await api_client.get("/city/Ébo")
+        assert response.status_code == 200
+        assert response.json()["galamsay_sites"] == 4
 
 
 # ============================================================================
@@ -329,27 +717,10 @@ class TestAPI:
 class TestEdgeCases:
     """Tests for edge cases and boundary conditions."""
     
-    def test_zero_sites_valid(self):
-        """A city with 0 galamsay sites should be valid."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'SomeCity', 'Region': 'SomeRegion', 'Number_of_Galamsay_Sites': '0'}
-        
-        cleaned = analyzer.clean_row(row)
-        assert cleaned is not None
-        assert cleaned['sites'] == 0
-    
-    def test_very_large_number(self):
-        """Very large numbers should be flagged as suspicious but still valid."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
-        row = {'City': 'SomeCity', 'Region': 'SomeRegion', 'Number_of_Galamsay_Sites': '999'}
-        
-        cleaned = analyzer.clean_row(row)
-        # Should still be accepted (flagged as warning, not error)
-        assert cleaned is not None or len(analyzer.errors) > 0
+    pytestmark = pytest.mark.fast
     
-    def test_empty_csv(self):
+    def test_empty_csv(self, analyzer):
         """Empty CSV should fail gracefully."""
-        analyzer = GalamsayAnalyzer("dummy.csv")
         analyzer.raw_data = []
         result = analyzer.clean_data()
         